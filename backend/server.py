@@ -14,6 +14,7 @@ import hashlib
 import base64
 import httpx
 import time
+import asyncio
 from collections import defaultdict
 from pathlib import Path
 from pydantic import BaseModel, Field, ConfigDict, field_validator
@@ -424,6 +425,21 @@ class CoachResponse(BaseModel):
     message_id: str
 
 
+class CoachBatchItem(BaseModel):
+    message: str
+    user_id: Optional[str] = None  # Falls back to "default"
+    workout_id: Optional[str] = None  # Overrides the batch-level workout_id
+    language: Optional[str] = None  # Overrides the batch-level language
+
+
+class CoachBatchRequest(BaseModel):
+    requests: List[CoachBatchItem] = Field(..., min_length=1, max_length=20)
+    workout_id: Optional[str] = None
+    context: Optional[str] = None
+    language: Optional[str] = "en"
+    deep_analysis: Optional[bool] = False
+
+
 class GuidanceRequest(BaseModel):
     language: Optional[str] = "en"
     user_id: Optional[str] = "default"
@@ -2690,22 +2706,28 @@ async def get_stats():
     }
 
 
+async def _recent_workouts() -> List[dict]:
+    """Up to 100 most recent workouts (newest first), mock data if none"""
+    all_workouts = await db.workouts.find({}, {"_id": 0}).sort("date", -1).to_list(100)
+    return all_workouts or get_mock_workouts()
+
+
 @api_router.post("/coach/analyze", response_model=CoachResponse)
 async def analyze_with_coach(request: CoachRequest):
     """Get analysis from CardioCoach - 100% LOCAL ENGINE, NO LLM
     
     Note: Conversational Q&A is disabled. Use specific workout analysis instead.
     """
+    return await _coach_analysis(request, await _recent_workouts())
+
+
+async def _coach_analysis(request: CoachRequest, all_workouts: List[dict]) -> CoachResponse:
+    """Body of /coach/analyze, given the recent workouts from _recent_workouts()"""
     user_id = request.user_id or "default"
     language = request.language or "fr"
     
     # If workout is specified, generate analysis using local engine
     if request.workout_id:
-        # Get all workouts for baseline
-        all_workouts = await db.workouts.find({}, {"_id": 0}).sort("date", -1).to_list(100)
-        if not all_workouts:
-            all_workouts = get_mock_workouts()
-        
         workout = await db.workouts.find_one({"id": request.workout_id}, {"_id": 0})
         if not workout:
             workout = next((w for w in all_workouts if w["id"] == request.workout_id), None)
@@ -2729,10 +2751,8 @@ async def analyze_with_coach(request: CoachRequest):
             
             return CoachResponse(response=response_text, message_id=msg_id)
     
-    # No workout specified - provide general guidance
-    all_workouts = await db.workouts.find({}, {"_id": 0}).sort("date", -1).to_list(50)
-    if not all_workouts:
-        all_workouts = get_mock_workouts()
+    # No workout specified - provide general guidance from the 50 most recent
+    all_workouts = all_workouts[:50]
     
     # Get week stats for context
     week_stats = calculate_week_stats(all_workouts)
@@ -2755,6 +2775,29 @@ async def analyze_with_coach(request: CoachRequest):
     return CoachResponse(response=response_text, message_id=msg_id)
 
 
+@api_router.post("/coach/analyze/batch", response_model=List[CoachResponse])
+async def analyze_with_coach_batch(request: CoachBatchRequest):
+    """Run several coach analyses in one round trip
+    
+    Each item goes through the same path as /coach/analyze; batch-level
+    workout_id/language apply unless the item overrides them. The recent
+    workouts are read once for the whole batch and the items run
+    concurrently; responses come back in request order.
+    """
+    all_workouts = await _recent_workouts()
+    return await asyncio.gather(*(
+        _coach_analysis(CoachRequest(
+            message=item.message,
+            workout_id=item.workout_id or request.workout_id,
+            context=request.context,
+            language=item.language or request.language,
+            deep_analysis=request.deep_analysis,
+            user_id=item.user_id or "default"
+        ), all_workouts)
+        for item in request.requests
+    ))
+
+
 @api_router.get("/coach/history")
 async def get_conversation_history(user_id: str = "default", limit: int = 50):
     """Get conversation history for a user"""
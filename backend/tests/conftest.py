@@ -0,0 +1,26 @@
+"""
+Shared pytest setup for the backend API tests
+"""
+import os
+import sys
+from pathlib import Path
+
+import pytest
+import requests
+
+# The repo root holds cardio_tester and the test scripts; importing their
+# vocabulary keeps these tests checking exactly what the scripts check
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+BASE_URL = os.environ.get('REACT_APP_BACKEND_URL', '').rstrip('/')
+
+
+@pytest.fixture(scope="module")
+def workout_id():
+    """Id of the first workout, fetched once per test module"""
+    response = requests.get(f"{BASE_URL}/api/workouts", timeout=30)
+    assert response.status_code == 200
+    workouts = response.json()
+    if not workouts:
+        pytest.skip("No workouts available")
+    return workouts[0]["id"]
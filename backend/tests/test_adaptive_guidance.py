@@ -0,0 +1,75 @@
+"""
+Test suite for Adaptive Guidance - /api/coach/guidance and /api/coach/guidance/latest
+Pytest counterpart of the root test_guidance.py script; each case is an
+independent test so it can be selected or rerun on its own:
+- Guidance generation per language (status, content, no medical language)
+- Latest guidance mirrors the last generated one, with a training summary
+
+Guidance is generated once per language for a throwaway test_guidance_* user
+and shared by the checks. There is no endpoint to delete guidance, so each run
+leaves those two documents in db.guidance.
+"""
+import pytest
+import requests
+import os
+import uuid
+
+from cardio_tester import MEDICAL_RX
+
+BASE_URL = os.environ.get('REACT_APP_BACKEND_URL', '').rstrip('/')
+
+VALID_STATUSES = {"maintain", "adjust", "hold_steady"}
+
+
+@pytest.fixture(scope="module", params=["en", "fr"])
+def generated(request):
+    """(user_id, language, response) of one generation per language"""
+    language = request.param
+    user_id = f"test_guidance_{uuid.uuid4().hex[:8]}"
+    response = requests.post(f"{BASE_URL}/api/coach/guidance", json={
+        "language": language,
+        "user_id": user_id
+    }, timeout=60)
+    assert response.status_code == 200, f"Expected 200, got {response.status_code}"
+    return user_id, language, response.json()
+
+
+class TestAdaptiveGuidance:
+    """Test /api/coach/guidance endpoints"""
+
+    def test_generate_guidance_status_is_valid(self, generated):
+        """Test that the detected status is one of the known values"""
+        _, language, data = generated
+        assert data.get("status") in VALID_STATUSES, f"Invalid status: {data.get('status')}"
+        assert data.get("generated_at"), "generated_at should be set"
+        print(f"✓ [{language}] status: {data['status']}")
+
+    def test_generate_guidance_has_content(self, generated):
+        """Test that guidance is substantial and free of medical language"""
+        _, language, data = generated
+        guidance = data.get("guidance", "")
+        assert len(guidance) > 50, f"Guidance too short ({len(guidance)} chars)"
+
+        found_medical = sorted(set(MEDICAL_RX.findall(guidance.lower())))
+        assert not found_medical, f"Contains medical language: {found_medical}"
+        print(f"✓ [{language}] guidance: '{guidance[:50]}...'")
+
+    def test_latest_guidance_matches_generated(self, generated):
+        """Test that /latest returns the guidance just generated, with a training summary"""
+        user_id, language, data = generated
+
+        response = requests.get(f"{BASE_URL}/api/coach/guidance/latest?user_id={user_id}", timeout=30)
+        assert response.status_code == 200, f"Expected 200, got {response.status_code}"
+        latest = response.json()
+        assert latest, "Latest guidance should not be empty after generating one"
+        assert latest["status"] == data["status"]
+        assert latest["language"] == language
+        assert "last_14d" in latest.get("training_summary", {}), "Missing last_14d training summary"
+        print(f"✓ [{language}] latest guidance status: {latest['status']}")
+
+    def test_latest_guidance_empty_for_unknown_user(self):
+        """Test that a user without guidance gets an empty response"""
+        user_id = f"test_guidance_{uuid.uuid4().hex[:8]}"
+        response = requests.get(f"{BASE_URL}/api/coach/guidance/latest?user_id={user_id}", timeout=30)
+        assert response.status_code == 200, f"Expected 200, got {response.status_code}"
+        assert response.json() is None, "Expected no guidance for a new user"
@@ -0,0 +1,79 @@
+"""
+Test suite for batched coach analysis - POST /api/coach/analyze/batch
+Tests:
+- One call returns one CoachResponse per request item, in order
+- Item-level language overrides the batch-level language
+- Empty and oversized batches are rejected (422)
+"""
+import pytest
+import requests
+import os
+import uuid
+
+BASE_URL = os.environ.get('REACT_APP_BACKEND_URL', '').rstrip('/')
+
+
+class TestCoachAnalyzeBatch:
+    """Test /api/coach/analyze/batch endpoint"""
+
+    @pytest.fixture(autouse=True)
+    def setup(self):
+        """Unique user_id prefix per test, history cleared afterwards"""
+        self.user_prefix = f"test_batch_{uuid.uuid4().hex[:8]}"
+        yield
+        for i in range(3):
+            try:
+                requests.delete(f"{BASE_URL}/api/coach/history?user_id={self.user_prefix}_{i}")
+            except:
+                pass
+
+    def test_batch_returns_one_response_per_item(self, workout_id):
+        """Test that N request items yield N responses in order"""
+        response = requests.post(f"{BASE_URL}/api/coach/analyze/batch", json={
+            "workout_id": workout_id,
+            "language": "en",
+            "deep_analysis": True,
+            "requests": [
+                {"message": f"Deep analysis {i + 1}", "user_id": f"{self.user_prefix}_{i}"}
+                for i in range(3)
+            ]
+        }, timeout=60)
+
+        assert response.status_code == 200, f"Expected 200, got {response.status_code}"
+        data = response.json()
+        assert isinstance(data, list), "Batch response should be a list"
+        assert len(data) == 3, f"Expected 3 responses, got {len(data)}"
+        for item in data:
+            assert item.get("response"), "Each item should have a non-empty response"
+            assert item.get("message_id"), "Each item should have a message_id"
+        assert len({item["message_id"] for item in data}) == 3, "message_ids should be unique"
+        print(f"✓ Batch returned {len(data)} analyses")
+
+    def test_item_language_overrides_batch_language(self, workout_id):
+        """Test that an item-level language is used for that item only"""
+        batch = {
+            "workout_id": workout_id,
+            "language": "en",
+            "requests": [
+                {"message": "Analysis", "user_id": f"{self.user_prefix}_0"},
+                {"message": "Analyse", "user_id": f"{self.user_prefix}_1", "language": "fr"}
+            ]
+        }
+        response = requests.post(f"{BASE_URL}/api/coach/analyze/batch", json=batch, timeout=60)
+        assert response.status_code == 200
+
+        en_text, fr_text = (item["response"] for item in response.json())
+        assert en_text != fr_text, "EN and FR items should not produce the same text"
+        print(f"✓ FR item: '{fr_text[:50]}...'")
+
+    def test_empty_batch_rejected(self):
+        """Test that a batch without items is a validation error"""
+        response = requests.post(f"{BASE_URL}/api/coach/analyze/batch", json={"requests": []}, timeout=30)
+        assert response.status_code == 422, f"Expected 422, got {response.status_code}"
+
+    def test_oversized_batch_rejected(self):
+        """Test that more than 20 items is a validation error"""
+        response = requests.post(f"{BASE_URL}/api/coach/analyze/batch", json={
+            "requests": [{"message": "x"} for _ in range(21)]
+        }, timeout=30)
+        assert response.status_code == 422, f"Expected 422, got {response.status_code}"
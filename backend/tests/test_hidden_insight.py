@@ -0,0 +1,67 @@
+"""
+Test suite for the Hidden Insight section of deep analysis - POST /api/coach/analyze
+Pytest counterpart of the per-probe checks in backend_test_hidden_insight.py;
+every probe is its own test item, so one bad probe fails on its own
+(the aggregate ~60% probability check stays in the script):
+- Each deep-analysis probe returns a non-empty analysis
+- No motivational, alarmist or medical vocabulary in the analysis
+- French deep analysis is answered in French
+"""
+import pytest
+import requests
+import os
+import uuid
+
+from backend_test_hidden_insight import PROHIBITED_RX
+
+BASE_URL = os.environ.get('REACT_APP_BACKEND_URL', '').rstrip('/')
+
+NUM_PROBES = 6
+
+
+class TestHiddenInsight:
+    """Test deep analysis with the hidden insight section"""
+
+    @pytest.fixture(autouse=True)
+    def setup(self):
+        """Unique user_id per test, history cleared afterwards"""
+        self.user_id = f"test_insight_{uuid.uuid4().hex[:8]}"
+        yield
+        try:
+            requests.delete(f"{BASE_URL}/api/coach/history?user_id={self.user_id}")
+        except:
+            pass
+
+    def _analyze(self, workout_id, message, language):
+        response = requests.post(f"{BASE_URL}/api/coach/analyze", json={
+            "message": message,
+            "workout_id": workout_id,
+            "language": language,
+            "deep_analysis": True,
+            "user_id": self.user_id
+        }, timeout=60)
+        assert response.status_code == 200, f"Expected 200, got {response.status_code}"
+        return response.json().get("response", "")
+
+    @pytest.mark.parametrize("probe", range(NUM_PROBES))
+    def test_probe_has_no_prohibited_content(self, workout_id, probe):
+        """Test that a deep analysis stays calm, non-motivational and non-medical"""
+        text = self._analyze(workout_id, f"Deep analysis {probe + 1}", "en")
+        assert text, "Analysis should not be empty"
+
+        # Same vocabulary as the script, but checked on every probe rather than
+        # only those with a hidden insight: the tone rules cover the whole
+        # analysis, and this way each run checks all probes, not ~60% of them
+        found = sorted({match.group() for match in PROHIBITED_RX.finditer(text.lower())})
+        assert not found, f"Prohibited vocabulary in analysis: {found}"
+        print(f"✓ Probe {probe + 1}: {len(text)} chars, no prohibited vocabulary")
+
+    def test_french_deep_analysis(self, workout_id):
+        """Test that a French deep analysis is answered in French"""
+        text = self._analyze(workout_id, "Analyse approfondie de cette séance", "fr")
+        assert text, "Analysis should not be empty"
+
+        lowered = text.lower()
+        assert any(word in lowered for word in [" de ", " la ", " le ", " ta ", " ton "]), \
+            "Analysis does not look French"
+        print(f"✓ French analysis: '{text[:50]}...'")
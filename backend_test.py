@@ -1,6 +1,17 @@
-import unittest
-from base_tester import BaseTester  # Assuming BaseTester is defined in base_tester.py
+"""
+Placeholder backend feature checks, run with pytest from the repo root
+(pytest also runs BaseTester's setUp/tearDown):
 
+    pytest backend_test.py
+
+Skipped until the perform_feature_*_check helpers are written.
+"""
+import pytest
+
+from tests.base_tester import BaseTester
+
+
+@pytest.mark.skip(reason="placeholder checks not implemented")
 class BackendTest(BaseTester):
     def setUp(self):
         super().setUp()
@@ -8,12 +19,12 @@ class BackendTest(BaseTester):
 
     def test_feature_one(self):
         # Test code for feature one
-        self.assertTrue(self.perform_feature_one_check())
+        assert self.perform_feature_one_check()
 
     def test_feature_two(self):
         # Test code for feature two
-        self.assertTrue(self.perform_feature_two_check())
+        assert self.perform_feature_two_check()
 
     def tearDown(self):
         # Cleanup code, if necessary
-        super().tearDown()
\ No newline at end of file
+        super().tearDown()
@@ -1,201 +1,333 @@
 import requests
+import argparse
+import itertools
+import re
 import sys
-import json
-import time
-from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
 
-class CardioCoachHiddenInsightTester:
-    def __init__(self, base_url="https://repo-charger.preview.emergentagent.com/api"):
-        self.base_url = base_url
-        self.tests_run = 0
-        self.tests_passed = 0
+from cardio_tester import (MEDICAL_TERMS, CardioCoachAPITester, _dumps, _loads, flush_log, logger,
+                           recorded_http)
+
+def _skip_stochastic_requests(request):
+    """Keep the hidden-insight probes out of the cassette (vcrpy sends ignored
+    requests live) - they measure how often the AI adds an insight, which a
+    replay would freeze. The root GET stays live too: it is the reachability
+    gate, and a replayed 200 would hide a backend that is down."""
+    if request.method == "GET" and request.path.endswith("/api/"):
+        return None
+    body = request.body or b""
+    if isinstance(body, str):
+        body = body.encode()
+    if request.path.endswith("/coach/analyze/batch") or b"test_user_" in body:
+        return None
+    return request
+
+
+# Upper bound on concurrent deep-analysis probes
+MAX_PARALLEL_PROBES = 8
+
+# Phrase groups compiled once into one alternation each, so a response is
+# scanned in a single pass per group instead of once per phrase. Callers
+# lowercase the text once and match every group against that copy.
+HIDDEN_EN_RX = re.compile(
+    r'hidden insight|worth noting|something subtle|an interesting pattern|one detail stands out')
+HIDDEN_FR_RX = re.compile(
+    r'observation discrete|a noter|quelque chose de subtil|un pattern interessant|un detail ressort')
+# The three prohibited-content groups share one pattern; the named group of
+# each match says which category it hit, so one sweep covers all three
+PROHIBITED_RX = re.compile(
+    r'(?P<motivational>great job|keep it up|well done|excellent|amazing)'
+    r'|(?P<alarm>warning|danger|concerning|alarming|critical)'
+    rf'|(?P<medical>{MEDICAL_TERMS})')
+
+
+# Canned data for --offline runs, which exercise the client-side code paths
+# (URL building, status checks, JSON parsing, phrase detection) in-process
+OFFLINE_WORKOUTS = [
+    {"id": "offline-1", "name": "Easy Run", "type": "run", "data_source": "strava"}
+]
+OFFLINE_ANALYSES = [
+    "Steady aerobic session, in line with your baseline. Worth noting: cadence held "
+    "through the final kilometres.",
+    "Steady aerobic session, in line with your baseline pace and heart rate.",
+]
+OFFLINE_ANALYSIS_FR = "Seance reguliere, proche de ta reference. A noter : la cadence est restee stable."
+_offline_counter = itertools.count()
+
+
+def _offline_analysis(request):
+    """Canned coach/analyze reply; EN replies alternate with/without an insight"""
+    payload = _loads(request.body or b"{}")
+    if payload.get("language") == "fr":
+        text = OFFLINE_ANALYSIS_FR
+    else:
+        text = OFFLINE_ANALYSES[next(_offline_counter) % len(OFFLINE_ANALYSES)]
+    return 200, {}, _dumps({"response": text, "message_id": "offline"})
+
+
+def offline_backend(tester, online_ai=False):
+    """Mock the API in-process with `responses`; coach/* can stay live
+
+    The tester's fixture store is switched off, so mocked responses never
+    end up replayed against the real backend.
+    """
+    import responses
+    tester.use_fixtures = False
+    base_url = tester.base_url
+    mock = responses.RequestsMock(assert_all_requests_are_fired=False)
+    mock.add(responses.GET, f"{base_url}/", json={"message": "CardioCoach API"}, status=200)
+    mock.add(responses.GET, f"{base_url}/workouts", json=OFFLINE_WORKOUTS, status=200)
+    if online_ai:
+        mock.add_passthru(f"{base_url}/coach/")
+    else:
+        mock.add_callback(responses.POST, f"{base_url}/coach/analyze",
+                          callback=_offline_analysis, content_type="application/json")
+    return mock
+
+
+def _probe_body(shared_body, user_id):
+    """Append one probe's user_id to the pre-encoded shared JSON payload"""
+    return shared_body[:-1] + b',"user_id":' + _dumps(user_id) + b'}'
+
+
+class CardioCoachHiddenInsightTester(CardioCoachAPITester):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
         self.hidden_insight_results = []
+        self.hidden_insight_positive = 0
+        self._first_workout = None
+        self._batch_unavailable = False
 
-    def run_test(self, name, method, endpoint, expected_status, data=None, headers=None):
-        """Run a single API test"""
-        url = f"{self.base_url}/{endpoint}"
-        if headers is None:
-            headers = {'Content-Type': 'application/json'}
+    def test_root_endpoint(self):
+        """Test the API root; returns whether the backend answered
 
-        self.tests_run += 1
-        print(f"\n🔍 Testing {name}...")
+        This is the reachability gate, so it always goes to the network: it is
+        kept out of the fixture store (here) and the cassette, and FIXTURES_ONLY
+        still needs a reachable backend.
+        """
+        logger.info("\n=== TESTING BASIC ENDPOINTS ===")
         
-        try:
-            if method == 'GET':
-                response = requests.get(url, headers=headers, timeout=30)
-            elif method == 'POST':
-                response = requests.post(url, json=data, headers=headers, timeout=30)
-            elif method == 'DELETE':
-                response = requests.delete(url, headers=headers, timeout=30)
+        success, _ = self.run_test("Root endpoint", "GET", "", 200, profile='fast', cache=False)
+        return success
 
-            success = response.status_code == expected_status
-            if success:
-                self.tests_passed += 1
-                print(f"✅ Passed - Status: {response.status_code}")
-                try:
-                    return success, response.json()
-                except:
-                    return success, response.text
-            else:
-                print(f"❌ Failed - Expected {expected_status}, got {response.status_code}")
-                print(f"Response: {response.text[:200]}")
-                return False, {}
+    def test_basic_endpoints(self):
+        """Test the workouts endpoint and keep the first workout for later tests"""
+        success, workouts = self.run_test("Get workouts", "GET", "workouts", 200, full_body=True)
+        if success and isinstance(workouts, list) and workouts:
+            logger.info("✅ Found %s workouts", len(workouts))
+            # Later tests only use the first workout; the list itself is not kept
+            self._first_workout = workouts[0]
+            return workouts
+        else:
+            logger.warning("❌ No workouts found or invalid response")
+            return []
 
-        except Exception as e:
-            print(f"❌ Failed - Error: {str(e)}")
-            return False, {}
+    def get_first_workout(self):
+        """First workout from the workouts list, or None"""
+        return self._first_workout
 
-    def test_basic_endpoints(self):
-        """Test basic API endpoints"""
-        print("\n=== TESTING BASIC ENDPOINTS ===")
+    def get_first_workout_id(self):
+        """Id of the first workout, or None"""
+        workout = self.get_first_workout()
+        return workout.get("id") if workout else None
+
+    def _score_hidden_test(self, i, analysis_text):
+        """Score one probe's text; only the verdict and keyword hits are kept"""
+        lowered = analysis_text.lower()
         
-        # Test root endpoint
-        self.run_test("Root endpoint", "GET", "", 200)
+        # Check for hidden insight indicators
+        has_hidden_insight = HIDDEN_EN_RX.search(lowered) is not None
         
-        # Test workouts endpoint
-        success, workouts = self.run_test("Get workouts", "GET", "workouts", 200)
-        if success and isinstance(workouts, list) and len(workouts) > 0:
-            print(f"✅ Found {len(workouts)} workouts")
-            return workouts
+        if has_hidden_insight:
+            logger.info("✅ Hidden insight detected in response %s", i+1)
         else:
-            print("❌ No workouts found or invalid response")
-            return []
+            logger.info("ℹ️  No hidden insight in response %s", i+1)
+        
+        # The content-quality check only needs these hit sets, so the AI text
+        # itself is not held on to
+        hits = {"motivational": set(), "alarm": set(), "medical": set()}
+        for match in PROHIBITED_RX.finditer(lowered):
+            hits[match.lastgroup].add(match.group())
+        with self._lock:
+            if has_hidden_insight:
+                self.hidden_insight_positive += 1
+        self.hidden_insight_results.append({
+            "test_number": i+1,
+            "has_hidden_insight": has_hidden_insight,
+            "response_length": len(analysis_text),
+            "motivational_hits": hits["motivational"],
+            "alarm_hits": hits["alarm"],
+            "medical_hits": hits["medical"]
+        })
+        return has_hidden_insight
 
-    def test_hidden_insight_probability(self, workouts, num_tests=8):
-        """Test hidden insight probability (~60%)"""
-        print(f"\n=== TESTING HIDDEN INSIGHT PROBABILITY ({num_tests} tests) ===")
+    def _one_hidden_test(self, shared_body, i, num_tests):
+        """Run one deep-analysis probe; True/False for insight, None on failure"""
+        logger.info("\nTest %s/%s: Deep analysis request", i+1, num_tests)
         
-        if not workouts:
-            print("❌ No workouts available for testing")
-            return
+        success, response = self.run_test(
+            f"Deep analysis {i+1}",
+            "POST",
+            "coach/analyze",
+            200,
+            data=_probe_body(shared_body, f"test_user_{i}"),
+            full_body=True,
+            profile='ai',
+            cache=False
+        )
         
-        # Use first workout for testing
-        test_workout = workouts[0]
-        workout_id = test_workout.get("id")
+        if not (success and isinstance(response, dict)):
+            logger.warning("❌ Failed to get valid response for test %s", i+1)
+            return None
         
-        hidden_insight_count = 0
+        return self._score_hidden_test(i, response.get("response", ""))
+
+    def batch_analyze(self, name, items, cache=True, **shared):
+        """Send several analyses in one coach/analyze/batch call
         
-        for i in range(num_tests):
-            print(f"\nTest {i+1}/{num_tests}: Deep analysis request")
-            
-            success, response = self.run_test(
-                f"Deep analysis {i+1}",
-                "POST",
-                "coach/analyze",
-                200,
-                data={
+        `items` are per-analysis fields (message, user_id, ...), `shared` the
+        batch-level ones. Returns the responses in order, or None when the
+        batch is unavailable; a 404 is remembered so later calls skip it.
+        """
+        if self._batch_unavailable:
+            return None
+        logger.info("\n🔍 Testing %s (%s requests)...", name, len(items))
+        data = dict(shared, requests=items)
+        try:
+            status, raw = self._fetch(name, "POST", self._api_prefix + "coach/analyze/batch",
+                                      data, None, True, 'ai', expected_status=200, cache=cache)
+            if status == 404:
+                self._batch_unavailable = True
+            responses = _loads(raw) if status == 200 else None
+        except (requests.RequestException, ValueError):
+            responses = None
+        if not isinstance(responses, list) or len(responses) != len(items):
+            return None
+        return responses
+
+    def _batch_hidden_tests(self, test_workout, num_tests):
+        """All probes in one coach/analyze/batch call; None if that is unavailable"""
+        items = self.batch_analyze(
+            "Deep analysis batch",
+            [
+                {
                     "message": f"Deep analysis of workout: {test_workout.get('name', 'Test Workout')}",
-                    "workout_id": workout_id,
-                    "language": "en",
-                    "deep_analysis": True,
                     "user_id": f"test_user_{i}"
                 }
-            )
-            
-            if success and isinstance(response, dict):
-                analysis_text = response.get("response", "")
-                
-                # Check for hidden insight indicators
-                has_hidden_insight = any(phrase in analysis_text.lower() for phrase in [
-                    "hidden insight",
-                    "worth noting",
-                    "something subtle",
-                    "an interesting pattern",
-                    "one detail stands out"
-                ])
-                
-                if has_hidden_insight:
-                    hidden_insight_count += 1
-                    print(f"✅ Hidden insight detected in response {i+1}")
-                else:
-                    print(f"ℹ️  No hidden insight in response {i+1}")
-                
-                self.hidden_insight_results.append({
-                    "test_number": i+1,
-                    "has_hidden_insight": has_hidden_insight,
-                    "response_length": len(analysis_text),
-                    "response_preview": analysis_text[:300] + "..." if len(analysis_text) > 300 else analysis_text
-                })
-                
-                # Small delay to avoid rate limiting
-                time.sleep(2)
-            else:
-                print(f"❌ Failed to get valid response for test {i+1}")
+                for i in range(num_tests)
+            ],
+            cache=False,
+            workout_id=test_workout.get("id"),
+            language="en",
+            deep_analysis=True
+        )
+        if items is None:
+            logger.info("ℹ️  coach/analyze/batch unavailable - sending probes one by one")
+            return None
+        
+        outcomes = []
+        for i, item in enumerate(items):
+            self._record(True)
+            outcomes.append(self._score_hidden_test(i, item.get("response", "")))
+        return outcomes
+
+    def test_hidden_insight_probability(self, num_tests=8):
+        """Test hidden insight probability (~60%)"""
+        logger.info("\n=== TESTING HIDDEN INSIGHT PROBABILITY (%s tests) ===", num_tests)
+        
+        # Use first workout for testing
+        test_workout = self.get_first_workout()
+        if not test_workout:
+            logger.warning("❌ No workouts available for testing")
+            return
+        
+        # One batched round trip when the backend supports it; otherwise the
+        # probes (distinct user_ids, only the aggregate matters) run
+        # concurrently, at most MAX_PARALLEL_PROBES in flight
+        outcomes = self._batch_hidden_tests(test_workout, num_tests)
+        if outcomes is None:
+            # Probes differ only in user_id, so the rest is encoded once
+            shared_body = _dumps({
+                "message": f"Deep analysis of workout: {test_workout.get('name', 'Test Workout')}",
+                "workout_id": test_workout.get("id"),
+                "language": "en",
+                "deep_analysis": True
+            })
+            with ThreadPoolExecutor(max_workers=min(num_tests, MAX_PARALLEL_PROBES)) as executor:
+                outcomes = list(executor.map(
+                    lambda i: self._one_hidden_test(shared_body, i, num_tests), range(num_tests)
+                ))
+        self.hidden_insight_results.sort(key=lambda r: r["test_number"])
+        hidden_insight_count = sum(1 for outcome in outcomes if outcome)
         
         # Calculate probability
         probability = (hidden_insight_count / num_tests) * 100
-        print(f"\n📊 HIDDEN INSIGHT PROBABILITY RESULTS:")
-        print(f"   Hidden insights found: {hidden_insight_count}/{num_tests}")
-        print(f"   Probability: {probability:.1f}%")
-        print(f"   Expected: ~60%")
+        logger.info("\n📊 HIDDEN INSIGHT PROBABILITY RESULTS:")
+        logger.info("   Hidden insights found: %s/%s", hidden_insight_count, num_tests)
+        logger.info("   Probability: %.1f%%", probability)
+        logger.info("   Expected: ~60%")
         
         # Check if probability is within reasonable range (40-80%)
-        if 40 <= probability <= 80:
-            print(f"✅ Probability within expected range")
-            self.tests_passed += 1
+        in_range = 40 <= probability <= 80
+        if in_range:
+            logger.info("✅ Probability within expected range")
         else:
-            print(f"❌ Probability outside expected range (40-80%)")
+            logger.warning("❌ Probability outside expected range (40-80%)")
         
-        self.tests_run += 1
+        self._record(in_range)
 
     def test_hidden_insight_content_quality(self):
         """Test hidden insight content requirements"""
-        print(f"\n=== TESTING HIDDEN INSIGHT CONTENT QUALITY ===")
-        
-        # Analyze responses that contained hidden insights
-        insights_with_content = [r for r in self.hidden_insight_results if r["has_hidden_insight"]]
+        logger.info("\n=== TESTING HIDDEN INSIGHT CONTENT QUALITY ===")
         
-        if not insights_with_content:
-            print("❌ No hidden insights found to analyze content")
+        # Counted while scoring, so nothing needs walking when there is none
+        if not self.hidden_insight_positive:
+            logger.warning("❌ No hidden insights found to analyze content")
             return
         
-        print(f"Analyzing {len(insights_with_content)} responses with hidden insights...")
-        
-        # Check for prohibited content
-        prohibited_motivational = ["great job", "keep it up", "well done", "excellent", "amazing"]
-        prohibited_alarms = ["warning", "danger", "concerning", "alarming", "critical"]
-        prohibited_medical = ["diagnosis", "disease", "treatment", "medical", "pathology"]
+        logger.info("Analyzing %s responses with hidden insights...", self.hidden_insight_positive)
         
         content_issues = []
         
-        for result in insights_with_content:
-            response_text = result["response_preview"].lower()
+        # Analyze responses that contained hidden insights
+        for result in self.hidden_insight_results:
+            if not result["has_hidden_insight"]:
+                continue
             
             # Check for motivational language
-            found_motivational = [word for word in prohibited_motivational if word in response_text]
+            found_motivational = sorted(result["motivational_hits"])
             if found_motivational:
                 content_issues.append(f"Test {result['test_number']}: Found motivational language: {found_motivational}")
             
             # Check for alarm words
-            found_alarms = [word for word in prohibited_alarms if word in response_text]
+            found_alarms = sorted(result["alarm_hits"])
             if found_alarms:
                 content_issues.append(f"Test {result['test_number']}: Found alarm words: {found_alarms}")
             
             # Check for medical terms
-            found_medical = [word for word in prohibited_medical if word in response_text]
+            found_medical = sorted(result["medical_hits"])
             if found_medical:
                 content_issues.append(f"Test {result['test_number']}: Found medical terms: {found_medical}")
         
         if content_issues:
-            print("❌ Content quality issues found:")
+            logger.warning("❌ Content quality issues found:")
             for issue in content_issues:
-                print(f"   {issue}")
+                logger.warning("   %s", issue)
         else:
-            print("✅ No prohibited content found in hidden insights")
-            self.tests_passed += 1
+            logger.info("✅ No prohibited content found in hidden insights")
         
-        self.tests_run += 1
+        self._record(not content_issues)
 
-    def test_language_support(self, workouts):
+    def test_language_support(self):
         """Test French language support"""
-        print(f"\n=== TESTING LANGUAGE SUPPORT ===")
+        logger.info("\n=== TESTING LANGUAGE SUPPORT ===")
         
-        if not workouts:
-            print("❌ No workouts available for language testing")
+        workout_id = self.get_first_workout_id()
+        if not workout_id:
+            logger.warning("❌ No workouts available for language testing")
             return
         
-        workout_id = workouts[0].get("id")
-        
         # Test French analysis
         success, response = self.run_test(
             "French deep analysis",
@@ -208,50 +340,81 @@ class CardioCoachHiddenInsightTester:
                 "language": "fr",
                 "deep_analysis": True,
                 "user_id": "test_french"
-            }
+            },
+            full_body=True,
+            profile='ai'
         )
         
         if success and isinstance(response, dict):
             analysis_text = response.get("response", "")
             
             # Check for French hidden insight indicators
-            has_french_insight = any(phrase in analysis_text.lower() for phrase in [
-                "observation discrete",
-                "a noter",
-                "quelque chose de subtil",
-                "un pattern interessant",
-                "un detail ressort"
-            ])
+            has_french_insight = HIDDEN_FR_RX.search(analysis_text.lower()) is not None
             
             if has_french_insight:
-                print("✅ French hidden insight detected")
-                self.tests_passed += 1
+                logger.info("✅ French hidden insight detected")
             else:
-                print("ℹ️  No French hidden insight (may be probabilistic)")
+                logger.info("ℹ️  No French hidden insight (may be probabilistic)")
                 # Still count as pass since it's probabilistic
-                self.tests_passed += 1
         else:
-            print("❌ French analysis failed")
-        
-        self.tests_run += 1
+            logger.warning("❌ French analysis failed")
+        # The verdict is the request's own, already counted by run_test
 
 def main():
+    parser = argparse.ArgumentParser(description="CardioCoach hidden insight tests")
+    parser.add_argument("--rate-per-sec", type=float, default=5,
+                        help="maximum sustained requests per second (default: 5)")
+    parser.add_argument("--offline", action="store_true",
+                        help="mock the backend in-process (requires the `responses` package)")
+    parser.add_argument("--online-ai", action="store_true",
+                        help="with --offline, still send coach/* calls to the live backend")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="ignore TEST_CACHE=1 and send every POST to the backend")
+    args = parser.parse_args()
+    
     print("🏃 CardioCoach Hidden Insight Testing")
     print("=" * 50)
     
-    tester = CardioCoachHiddenInsightTester()
-    
-    # Test basic functionality
-    workouts = tester.test_basic_endpoints()
-    
-    # Test hidden insight probability (key feature)
-    tester.test_hidden_insight_probability(workouts, num_tests=6)
+    tester = CardioCoachHiddenInsightTester(rate_per_sec=args.rate_per_sec)
+    if args.no_cache:
+        tester.cache_posts = False
     
-    # Test content quality
-    tester.test_hidden_insight_content_quality()
+    if args.offline:
+        backend = offline_backend(tester, online_ai=args.online_ai)
+    else:
+        # Fail fast: with the backend down every test would wait out its timeout
+        if not tester.is_reachable():
+            print("❌ Backend unreachable, aborting")
+            return 2
+        tester.warm_up()
+        backend = recorded_http("backend.yaml", _skip_stochastic_requests)
     
-    # Test language support
-    tester.test_language_support(workouts)
+    with tester, backend as cassette:
+        # Test basic functionality
+        if not tester.test_root_endpoint():
+            flush_log()
+            print("❌ Backend unreachable, aborting")
+            return 2
+        tester.test_basic_endpoints()
+        flush_log()
+        
+        # Hidden insight probability (key feature) and French support only share
+        # the workouts list, so their slow AI calls can overlap - except while
+        # a cassette records, as vcrpy is not thread-safe and would drop one
+        # (on replay the French call is instant anyway)
+        recording = not args.offline and not isinstance(backend, nullcontext)
+        with ThreadPoolExecutor(max_workers=1 if recording else 2) as executor:
+            futures = [
+                executor.submit(tester.test_hidden_insight_probability, 6),
+                executor.submit(tester.test_language_support),
+            ]
+            for future in futures:
+                future.result()
+        flush_log()
+        
+        # Test content quality (needs the probability results)
+        tester.test_hidden_insight_content_quality()
+        flush_log()
     
     # Print final results
     print(f"\n📊 FINAL TEST RESULTS")
@@ -259,9 +422,13 @@ def main():
     print(f"Tests passed: {tester.tests_passed}/{tester.tests_run}")
     print(f"Success rate: {(tester.tests_passed/tester.tests_run)*100:.1f}%")
     
+    # Print where the time went
+    tester.print_timings()
+    tester.print_replays(cassette)
+    
     # Print hidden insight summary
     if tester.hidden_insight_results:
-        insights_found = sum(1 for r in tester.hidden_insight_results if r["has_hidden_insight"])
+        insights_found = tester.hidden_insight_positive
         total_tests = len(tester.hidden_insight_results)
         print(f"\nHidden Insight Summary:")
         print(f"  Found in {insights_found}/{total_tests} tests ({(insights_found/total_tests)*100:.1f}%)")
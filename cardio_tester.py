@@ -0,0 +1,431 @@
+"""
+Shared HTTP plumbing for the CardioCoach API test scripts
+(backend_test_hidden_insight.py, test_guidance.py).
+
+CardioCoachAPITester owns the pooled session, retries, rate limiting,
+timeouts and pass/fail bookkeeping; each script subclasses it and only
+adds its own test_* methods and main().
+
+The transport is deliberately requests/urllib3 (HTTP/1.1 keep-alive): the
+Retry adapter, the VCR cassettes and the `responses` offline mock all hook
+into it. Concurrency comes from threads sharing the session's connection
+pool, which is sized (pool_maxsize) for every in-flight call to keep its
+own kept-alive connection, so there is no head-of-line blocking to remove.
+"""
+
+import requests
+import hashlib
+import io
+import logging
+import os
+import re
+import reprlib
+import socket
+import sys
+import json
+import time
+import threading
+from contextlib import nullcontext
+from pathlib import Path
+from urllib.parse import urlparse
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection
+from urllib3.exceptions import ReadTimeoutError
+from urllib3.util.retry import Retry
+
+try:
+    import orjson
+except ImportError:  # stdlib json is used when orjson is not installed
+    orjson = None
+
+DEFAULT_BASE_URL = "https://repo-charger.preview.emergentagent.com/api"
+
+
+class LadderRetry(Retry):
+    """Retry that hands read timeouts back to the caller
+
+    Plain Retry resends a timed-out request up to `total` times with the same
+    read timeout (4 x 60s on a wedged AI endpoint); _fetch retries it instead,
+    climbing the profile's TIMEOUTS ladder.
+    """
+
+    def increment(self, method=None, url=None, response=None, error=None, _pool=None, _stacktrace=None):
+        if isinstance(error, ReadTimeoutError):
+            raise error
+        return super().increment(method, url, response, error, _pool, _stacktrace)
+
+
+# Transient failures (network blips, gateway errors, throttling) are retried
+# by urllib3 with exponential backoff, honouring Retry-After. The jitter keeps
+# concurrent probes that hit the same 429/503 from retrying in lockstep
+RETRY_POLICY = LadderRetry(
+    total=3,
+    backoff_factor=1.0,
+    backoff_jitter=0.5,
+    backoff_max=30,
+    status_forcelist=(429, 502, 503, 504),
+    allowed_methods=frozenset(['GET', 'POST', 'DELETE']),
+    respect_retry_after_header=True,
+    raise_on_status=False
+)
+
+# TCP keepalive on pooled sockets: a connection the preview proxy silently
+# dropped is detected after ~1 minute instead of the OS default of hours
+KEEPALIVE_OPTIONS = [(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)] + [
+    (socket.IPPROTO_TCP, getattr(socket, name), value)
+    for name, value in (("TCP_KEEPIDLE", 30), ("TCP_KEEPINTVL", 10), ("TCP_KEEPCNT", 3))
+    if hasattr(socket, name)  # not all of them exist on macOS/Windows
+]
+
+
+class KeepAliveAdapter(HTTPAdapter):
+    """HTTPAdapter whose pooled connections have TCP keepalive enabled"""
+
+    def init_poolmanager(self, *args, **kwargs):
+        kwargs["socket_options"] = HTTPConnection.default_socket_options + KEEPALIVE_OPTIONS
+        super().init_poolmanager(*args, **kwargs)
+
+
+# Read timeouts (seconds) by endpoint class, one per attempt: the first is set
+# a little above the class's p95 so a hung call fails quickly, a read timeout
+# is retried once with the longer budget (60s for AI calls, which can take
+# 30-60s). A wedged AI endpoint costs 80s instead of 4 x 60s; connecting
+# always gets 3s
+CONNECT_TIMEOUT = 3
+TIMEOUTS = {'fast': (5, 10), 'normal': (10, 20), 'ai': (20, 60)}
+
+# Bodies of responses nobody inspects are only read up to this many bytes;
+# a response with an unexpected status only needs enough for the log preview
+MAX_PREVIEW_BYTES = 64 * 1024
+FAILURE_PREVIEW_BYTES = 200
+
+# Idempotent GET responses are written to disk as fixtures; FIXTURES_ONLY=1
+# replays entries younger than FIXTURE_TTL instead of hitting the network
+FIXTURES_DIR = Path(__file__).resolve().parent / "backend_test_fixtures"
+FIXTURE_TTL = 24 * 3600
+FIXTURES_ONLY = os.environ.get("FIXTURES_ONLY") == "1"
+SAFE_METHODS = frozenset(['GET', 'HEAD'])
+
+# TEST_CACHE=1 (dev loop only) also stores and replays POST responses, so
+# re-runs skip the LLM wait for identical coach/* calls
+TEST_CACHE = os.environ.get("TEST_CACHE") == "1"
+
+# Opt-in: with VCR_MODE set to a vcrpy record mode (e.g. new_episodes), each
+# script records its backend calls to a cassette under fixtures/ and replays
+# them on later runs, matched on the request body too so a changed prompt is
+# re-recorded. RECORD=1 re-records the cassettes; by default (off) every call
+# goes to the live backend. The summary says how much was replayed.
+VCR_MODE = "all" if os.environ.get("RECORD") == "1" else os.environ.get("VCR_MODE", "off")
+CASSETTE_DIR = Path(__file__).resolve().parent / "fixtures"
+
+# Medical vocabulary that neither coach analyses nor guidance may use; shared
+# by both testers and matched against lowercased text
+MEDICAL_TERMS = r'diagnosis|disease|treatment|medical|pathology'
+MEDICAL_RX = re.compile(MEDICAL_TERMS)
+
+# Progress lines are buffered in memory and written to stdout in one call per
+# phase instead of one small write per line
+_log_buffer = io.StringIO()
+_log_handler = logging.StreamHandler(_log_buffer)
+_log_handler.setFormatter(logging.Formatter("%(message)s"))
+logger = logging.getLogger("cardio_test")
+# LOG_LEVEL=WARNING silences the per-test progress lines but keeps failures
+# (logged at WARNING, with the test name); arguments are %-formatted lazily,
+# so suppressed lines cost no string building
+logger.setLevel(os.environ.get("LOG_LEVEL", "INFO").upper())
+logger.addHandler(_log_handler)
+logger.propagate = False
+
+
+def recorded_http(cassette, before_record_request=None):
+    """Cassette context for the backend calls, no-op when disabled
+
+    vcrpy is not thread-safe: callers run their tests one at a time while
+    this returns a real cassette.
+    """
+    if VCR_MODE == "off":
+        return nullcontext()
+    try:
+        import vcr
+    except ImportError:
+        logger.info("ℹ️  vcrpy not installed - running against the live backend")
+        return nullcontext()
+    return vcr.use_cassette(
+        str(CASSETTE_DIR / cassette),
+        record_mode=VCR_MODE,
+        match_on=['method', 'scheme', 'host', 'port', 'path', 'query', 'body'],
+        before_record_request=before_record_request
+    )
+
+
+def flush_log():
+    """Write the buffered progress lines to stdout"""
+    _log_handler.acquire()
+    try:
+        sys.stdout.write(_log_buffer.getvalue())
+        _log_buffer.seek(0)
+        _log_buffer.truncate()
+    finally:
+        _log_handler.release()
+    sys.stdout.flush()
+
+
+def _dumps(obj):
+    """Encode a JSON payload to bytes"""
+    return orjson.dumps(obj) if orjson else json.dumps(obj).encode()
+
+
+def _loads(raw):
+    """Decode a JSON body (bytes or str)"""
+    return orjson.loads(raw) if orjson else json.loads(raw)
+
+
+def _fixture_path(method, url, data):
+    """On-disk location of the fixture for one request"""
+    payload = data.decode() if isinstance(data, bytes) else json.dumps(data, sort_keys=True)
+    key = hashlib.sha256(f"{method}|{url}|{payload}".encode()).hexdigest()
+    return FIXTURES_DIR / f"{key}.json"
+
+
+def _load_fixture(path):
+    """Stored fixture if present and fresh, else None"""
+    try:
+        with open(path) as f:
+            fixture = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if time.time() - fixture.get("ts", 0) > FIXTURE_TTL:
+        return None
+    return fixture
+
+
+def _store_fixture(path, response, raw):
+    """Write a response to disk (via a temp file, so readers never see half)"""
+    FIXTURES_DIR.mkdir(exist_ok=True)
+    tmp = path.with_suffix(f".{threading.get_ident()}.tmp")
+    with open(tmp, "w") as f:
+        json.dump({
+            "status": response.status_code,
+            "headers": dict(response.headers),
+            "body": raw.decode('utf-8', errors='replace'),
+            "ts": time.time()
+        }, f)
+    os.replace(tmp, path)
+
+
+# reprlib bounds the work for nested values: long strings, lists and dicts are
+# elided while the preview is built rather than sliced off afterwards
+_preview_repr = reprlib.Repr()
+_preview_repr.maxstring = 200
+_preview_repr.maxother = 200
+_preview_repr.maxlist = 3
+_preview_repr.maxdict = 3
+
+
+def preview(obj, n=200):
+    """Short one-line preview of a response value for log output"""
+    if isinstance(obj, str):
+        return obj if len(obj) <= n else obj[:n] + "..."
+    return _preview_repr.repr(obj)[:n]
+
+
+class TokenBucket:
+    """Client-side rate limiter that keeps bursts under the server's limit"""
+
+    def __init__(self, rate_per_sec, burst):
+        self.rate = rate_per_sec
+        self.capacity = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Take a token, sleeping just long enough for one to be available"""
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            wait = max(0, (1 - self.tokens) / self.rate)
+            # Going negative reserves the token for this caller
+            self.tokens -= 1
+        if wait:
+            time.sleep(wait)
+
+
+class CardioCoachAPITester:
+    """Base class for the API test scripts: one pooled session, shared counters"""
+
+    def __init__(self, base_url=DEFAULT_BASE_URL, rate_per_sec=5):
+        self.base_url = base_url
+        # Endpoints are appended to this prefix as-is
+        self._api_prefix = base_url.rstrip('/') + '/'
+        self.tests_run = 0
+        self.tests_passed = 0
+        self.failed_tests = []
+        self.timings = []
+        self._lock = threading.Lock()
+        self._rate_limiter = TokenBucket(rate_per_sec=rate_per_sec, burst=10)
+        self.cache_posts = TEST_CACHE
+        # Cleared while a mock answers the calls, so canned responses are
+        # never stored under (or replayed in place of) the live ones
+        self.use_fixtures = True
+        self.replayed = 0
+
+        self.session = requests.Session()
+        self.session.headers.update({'Content-Type': 'application/json'})
+        adapter = KeepAliveAdapter(max_retries=RETRY_POLICY, pool_connections=4, pool_maxsize=20)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def close(self):
+        """Close the pooled connections"""
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def is_reachable(self, timeout=3):
+        """TCP probe so a dead backend fails in seconds, not one timeout per test"""
+        parsed = urlparse(self.base_url)
+        port = parsed.port or (443 if parsed.scheme == "https" else 80)
+        try:
+            socket.create_connection((parsed.hostname, port), timeout=timeout).close()
+            return True
+        except OSError:
+            return False
+
+    def warm_up(self):
+        """Open the pooled TLS connection before the first real test"""
+        try:
+            self.session.head(self._api_prefix, timeout=5)
+        except requests.RequestException:
+            pass
+
+    def _record(self, passed):
+        """Count a test result; safe to call from worker threads"""
+        with self._lock:
+            self.tests_run += 1
+            if passed:
+                self.tests_passed += 1
+
+    def _fetch(self, name, method, url, data, headers, full_body, profile, expected_status=None,
+               cache=True):
+        """Send one request, or replay its fixture; returns (status, raw body)"""
+        cacheable = cache and self.use_fixtures and (method in SAFE_METHODS or self.cache_posts)
+        if cacheable:
+            fixture_path = _fixture_path(method, url, data)
+            if FIXTURES_ONLY or method not in SAFE_METHODS:
+                fixture = _load_fixture(fixture_path)
+                if fixture is not None:
+                    logger.info("   (replayed from fixture)")
+                    with self._lock:
+                        self.replayed += 1
+                    return fixture["status"], fixture["body"].encode()
+
+        if isinstance(data, bytes):
+            body = data
+        else:
+            body = _dumps(data) if data is not None else None
+        ladder = TIMEOUTS[profile]
+        t0 = time.perf_counter()
+        for attempt, read_timeout in enumerate(ladder, 1):
+            self._rate_limiter.acquire()
+            try:
+                response = self.session.request(method, url, data=body, headers=headers,
+                                                timeout=(CONNECT_TIMEOUT, read_timeout), stream=True)
+                break
+            except requests.exceptions.ReadTimeout:
+                if attempt == len(ladder):
+                    raise
+                logger.info("   Read timeout after %ss, retrying with %ss", read_timeout, ladder[attempt])
+        if expected_status is not None and response.status_code != expected_status:
+            limit = FAILURE_PREVIEW_BYTES
+        else:
+            limit = None if full_body else MAX_PREVIEW_BYTES
+        try:
+            if limit is None:
+                raw = response.content
+            else:
+                raw = response.raw.read(limit, decode_content=True)
+        finally:
+            response.close()
+        self.timings.append((name, time.perf_counter() - t0, response.status_code))
+
+        # A body cut off at the read limit is not worth replaying, nor is a
+        # failed call: a 5xx must not overwrite a good fixture, and the next
+        # run should retry it
+        if cacheable and (limit is None or len(raw) < limit) and response.status_code == expected_status:
+            _store_fixture(fixture_path, response, raw)
+        return response.status_code, raw
+
+    def run_test(self, name, method, endpoint, expected_status, data=None, headers=None, full_body=False,
+                 profile='normal', cache=True):
+        """Run a single API test
+
+        Only the first MAX_PREVIEW_BYTES of the body are read unless the caller
+        consumes the result and asks for the full body, and only
+        FAILURE_PREVIEW_BYTES when the status is not the expected one. `profile` picks the
+        read-timeout ladder from TIMEOUTS; `headers` only needs per-call overrides,
+        the session already sends Content-Type. `data` may be a dict or an
+        already-encoded JSON body (bytes). `cache=False` keeps a call out of
+        the fixture store, for tests that measure non-deterministic output.
+        """
+        url = self._api_prefix + endpoint
+
+        logger.info("\n🔍 Testing %s...", name)
+        logger.info("   URL: %s", url)
+
+        try:
+            status, raw = self._fetch(name, method, url, data, headers, full_body, profile, expected_status,
+                                      cache)
+
+            success = status == expected_status
+            self._record(success)
+            if success:
+                logger.info("✅ Passed - Status: %s", status)
+                try:
+                    return success, _loads(raw)
+                except ValueError:
+                    return success, raw.decode('utf-8', errors='replace')
+            else:
+                body_preview = raw[:FAILURE_PREVIEW_BYTES].decode('utf-8', errors='replace')
+                logger.warning("❌ %s failed - Expected %s, got %s", name, expected_status, status)
+                logger.warning("Response: %s", body_preview)
+                self.failed_tests.append({
+                    "test": name,
+                    "endpoint": endpoint,
+                    "expected": expected_status,
+                    "actual": status,
+                    "response": body_preview
+                })
+                return False, {}
+
+        except Exception as e:
+            self._record(False)
+            logger.warning("❌ %s failed - Error: %s", name, e)
+            self.failed_tests.append({
+                "test": name,
+                "endpoint": endpoint,
+                "error": str(e)
+            })
+            return False, {}
+
+    def print_timings(self, top=5):
+        """Print the slowest calls and the total time spent on the network"""
+        if not self.timings:
+            return
+        print(f"\n⏱️  Slowest tests:")
+        for name, elapsed, status in sorted(self.timings, key=lambda t: t[1], reverse=True)[:top]:
+            print(f"  {elapsed:6.2f}s  {name} ({status})")
+        print(f"  Total network time: {sum(t[1] for t in self.timings):.2f}s")
+
+    def print_replays(self, cassette=None):
+        """Say how many responses were replayed instead of fetched live"""
+        play_count = getattr(cassette, "play_count", 0)
+        if play_count:
+            print(f"\n📼 {play_count} response(s) replayed from cassette (VCR_MODE={VCR_MODE})")
+        if self.replayed:
+            print(f"\n📼 {self.replayed} response(s) replayed from {FIXTURES_DIR.name}/")
@@ -1,62 +1,36 @@
 #!/usr/bin/env python3
 
-import requests
+import re
 import sys
-import json
-import time
-from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
 
-class GuidanceAPITester:
-    def __init__(self, base_url="https://repo-charger.preview.emergentagent.com"):
-        self.base_url = base_url
-        self.tests_run = 0
-        self.tests_passed = 0
-        self.failed_tests = []
+from cardio_tester import MEDICAL_RX, CardioCoachAPITester, flush_log, logger, preview, recorded_http
 
-    def run_test(self, name, method, endpoint, expected_status, data=None, timeout=45):
-        """Run a single API test"""
-        url = f"{self.base_url}/api/{endpoint}"
-        headers = {'Content-Type': 'application/json'}
+# Keyword groups compiled once; each check is one pass over the guidance
+# text, lowercased once per test
+RATIONALE_RX = re.compile(r'why|because|helps|targets|focus|now')
+MOTIVATIONAL_RX = re.compile(r'great|awesome|excellent|amazing|fantastic')
+FRENCH_STATUS_RX = re.compile(r'maintenir|ajuster|consolider')
+FRENCH_SESSION_RX = re.compile(r'seance|entrainement|session')
 
-        self.tests_run += 1
-        print(f"\n🔍 Testing {name}...")
-        print(f"   URL: {url}")
-        
-        try:
-            if method == 'GET':
-                response = requests.get(url, headers=headers, timeout=timeout)
-            elif method == 'POST':
-                response = requests.post(url, json=data, headers=headers, timeout=timeout)
 
-            success = response.status_code == expected_status
-            if success:
-                self.tests_passed += 1
-                print(f"✅ Passed - Status: {response.status_code}")
-                try:
-                    response_data = response.json()
-                    return True, response_data
-                except:
-                    return True, response.text
-            else:
-                print(f"❌ Failed - Expected {expected_status}, got {response.status_code}")
-                print(f"   Response: {response.text[:200]}...")
-                self.failed_tests.append({
-                    "test": name,
-                    "endpoint": endpoint,
-                    "expected": expected_status,
-                    "actual": response.status_code,
-                    "response": response.text[:200]
-                })
-                return False, {}
+class GuidanceAPITester(CardioCoachAPITester):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._latest_guidance = None
 
-        except Exception as e:
-            print(f"❌ Failed - Error: {str(e)}")
-            self.failed_tests.append({
-                "test": name,
-                "endpoint": endpoint,
-                "error": str(e)
-            })
-            return False, {}
+    def _get_latest(self):
+        """GET the latest guidance once; later callers reuse the response"""
+        if self._latest_guidance is None:
+            self._latest_guidance = self.run_test(
+                "Get Latest Guidance",
+                "GET",
+                "coach/guidance/latest?user_id=default",
+                200,
+                full_body=True
+            )
+        return self._latest_guidance
 
     def test_generate_guidance_english(self):
         """Test adaptive guidance generation in English"""
@@ -66,59 +40,58 @@ class GuidanceAPITester:
             "coach/guidance",
             200,
             data={"language": "en", "user_id": "default"},
-            timeout=60  # Longer timeout for AI processing
+            full_body=True,
+            profile='ai'
         )
         
         if success:
-            print(f"   Status: {response.get('status', 'N/A')}")
-            print(f"   Guidance length: {len(response.get('guidance', ''))} chars")
-            print(f"   Generated at: {response.get('generated_at', 'N/A')}")
+            logger.info("   Status: %s", response.get('status', 'N/A'))
+            logger.info("   Guidance length: %s chars", len(response.get('guidance', '')))
+            logger.info("   Generated at: %s", response.get('generated_at', 'N/A'))
             
             # Check status is valid
             valid_statuses = ["maintain", "adjust", "hold_steady"]
             status = response.get('status')
             if status in valid_statuses:
-                print(f"   ✅ Valid status: {status}")
+                logger.info("   ✅ Valid status: %s", status)
             else:
-                print(f"   ❌ Invalid status: {status}")
+                logger.warning("   ❌ Invalid status: %s", status)
                 
             # Check guidance content
             guidance = response.get('guidance', '')
+            lowered = guidance.lower()
             if len(guidance) > 50:  # Should have substantial content
-                print(f"   ✅ Guidance has substantial content")
+                logger.info("   ✅ Guidance has substantial content")
                 
                 # Check for session suggestions (max 3)
                 session_indicators = guidance.upper().count('SESSION')
-                print(f"   Found {session_indicators} session indicators")
+                logger.info("   Found %s session indicators", session_indicators)
                 
                 # Check for rationale ("why now" or similar)
-                rationale_keywords = ['why', 'because', 'helps', 'targets', 'focus', 'now']
-                found_rationale = any(keyword in guidance.lower() for keyword in rationale_keywords)
+                found_rationale = RATIONALE_RX.search(lowered) is not None
                 if found_rationale:
-                    print(f"   ✅ Contains rationale for suggestions")
+                    logger.info("   ✅ Contains rationale for suggestions")
                 else:
-                    print(f"   ⚠️  May be missing rationale")
+                    logger.info("   ⚠️  May be missing rationale")
                     
                 # Check tone (should be calm, technical, non-motivational)
-                motivational_words = ['great', 'awesome', 'excellent', 'amazing', 'fantastic']
-                found_motivational = any(word in guidance.lower() for word in motivational_words)
+                found_motivational = MOTIVATIONAL_RX.search(lowered) is not None
                 if not found_motivational:
-                    print(f"   ✅ Tone appears calm and non-motivational")
+                    logger.info("   ✅ Tone appears calm and non-motivational")
                 else:
-                    print(f"   ⚠️  May contain motivational language")
+                    logger.info("   ⚠️  May contain motivational language")
                     
                 # Check for medical language (should be avoided)
-                medical_words = ['diagnosis', 'treatment', 'medical', 'disease', 'pathology']
-                found_medical = any(word in guidance.lower() for word in medical_words)
+                found_medical = MEDICAL_RX.search(lowered) is not None
                 if not found_medical:
-                    print(f"   ✅ No medical language detected")
+                    logger.info("   ✅ No medical language detected")
                 else:
-                    print(f"   ❌ Contains medical language: should be avoided")
+                    logger.warning("   ❌ Contains medical language: should be avoided")
                     
-                print(f"   Preview: {guidance[:150]}...")
+                logger.info("   Preview: %s", preview(guidance, 150))
                     
             else:
-                print(f"   ❌ Guidance content too short")
+                logger.warning("   ❌ Guidance content too short")
                 
         return success, response
 
@@ -130,106 +103,120 @@ class GuidanceAPITester:
             "coach/guidance",
             200,
             data={"language": "fr", "user_id": "default"},
-            timeout=60  # Longer timeout for AI processing
+            full_body=True,
+            profile='ai'
         )
         
         if success:
-            print(f"   Status: {response.get('status', 'N/A')}")
-            print(f"   Guidance length: {len(response.get('guidance', ''))} chars")
+            logger.info("   Status: %s", response.get('status', 'N/A'))
+            logger.info("   Guidance length: %s chars", len(response.get('guidance', '')))
             
             # Check for French status terms
             guidance = response.get('guidance', '')
-            french_status_terms = ['maintenir', 'ajuster', 'consolider']
-            found_french = any(term in guidance.lower() for term in french_status_terms)
+            lowered = guidance.lower()
+            found_french = FRENCH_STATUS_RX.search(lowered) is not None
             if found_french:
-                print(f"   ✅ Contains French status terms")
+                logger.info("   ✅ Contains French status terms")
             else:
-                print(f"   ⚠️  May not contain expected French terms")
+                logger.info("   ⚠️  May not contain expected French terms")
                 
             # Check for French session indicators
-            french_session_terms = ['seance', 'entrainement', 'session']
-            found_sessions = any(term in guidance.lower() for term in french_session_terms)
+            found_sessions = FRENCH_SESSION_RX.search(lowered) is not None
             if found_sessions:
-                print(f"   ✅ Contains French session terminology")
+                logger.info("   ✅ Contains French session terminology")
             else:
-                print(f"   ⚠️  May be missing French session terms")
+                logger.info("   ⚠️  May be missing French session terms")
                 
-            print(f"   Preview: {guidance[:150]}...")
+            logger.info("   Preview: %s", preview(guidance, 150))
                 
         return success, response
 
     def test_get_latest_guidance(self):
         """Test retrieving latest guidance"""
-        success, response = self.run_test(
-            "Get Latest Guidance",
-            "GET",
-            "coach/guidance/latest?user_id=default",
-            200
-        )
+        success, response = self._get_latest()
         
         if success and response:
-            print(f"   Status: {response.get('status', 'N/A')}")
-            print(f"   Generated at: {response.get('generated_at', 'N/A')}")
-            print(f"   User ID: {response.get('user_id', 'N/A')}")
-            print(f"   Language: {response.get('language', 'N/A')}")
+            logger.info("   Status: %s", response.get('status', 'N/A'))
+            logger.info("   Generated at: %s", response.get('generated_at', 'N/A'))
+            logger.info("   User ID: %s", response.get('user_id', 'N/A'))
+            logger.info("   Language: %s", response.get('language', 'N/A'))
             
             # Check if training summary is included
             training_summary = response.get('training_summary')
             if training_summary:
-                print(f"   ✅ Includes training summary")
+                logger.info("   ✅ Includes training summary")
                 last_14d = training_summary.get('last_14d', {})
-                print(f"   Last 14d sessions: {last_14d.get('count', 0)}")
-                print(f"   Last 14d distance: {last_14d.get('total_km', 0)} km")
+                logger.info("   Last 14d sessions: %s", last_14d.get('count', 0))
+                logger.info("   Last 14d distance: %s km", last_14d.get('total_km', 0))
             else:
-                print(f"   ⚠️  Missing training summary")
+                logger.info("   ⚠️  Missing training summary")
                 
         elif success and not response:
-            print(f"   ℹ️  No guidance found (empty response)")
+            logger.info("   ℹ️  No guidance found (empty response)")
         
         return success, response
 
     def test_guidance_status_detection(self):
         """Test that guidance status is properly detected from AI response"""
-        success, response = self.run_test(
-            "Status Detection Test",
-            "GET",
-            "coach/guidance/latest?user_id=default",
-            200
-        )
+        # Same resource as test_get_latest_guidance: reuse its response
+        # rather than fetching it a second time
+        fetched = self._latest_guidance is not None
+        success, response = self._get_latest()
+        if fetched:
+            logger.info("\n🔍 Testing Status Detection Test (latest guidance already fetched)...")
+            self._record(success)
         
         if success and response:
             status = response.get('status')
-            valid_statuses = ["maintain", "adjust", "hold_steady"]
-            if status in valid_statuses:
-                print(f"   ✅ Valid status detected: {status}")
+            if status in {"maintain", "adjust", "hold_steady"}:
+                logger.info("   ✅ Valid status detected: %s", status)
             else:
-                print(f"   ❌ Invalid status: {status}")
+                logger.warning("   ❌ Invalid status: %s", status)
         else:
-            print(f"   ⚠️  No guidance to test status detection")
+            logger.info("   ⚠️  No guidance to test status detection")
         
         return success, response
 
+# Phases run in order; the tests within a phase are independent and run side
+# by side (EN and FR generation are two AI calls, so that phase costs one
+# wait instead of two). Latest guidance must follow generation, and status
+# detection reuses the latest-guidance response.
+SCHEDULE = [
+    ("\n⚠️  Testing Guidance Generation (EN + FR) (may take 30-60 seconds)...",
+     ["test_generate_guidance_english", "test_generate_guidance_french"]),
+    ("\n📋 Testing Latest Guidance Retrieval...", ["test_get_latest_guidance"]),
+    ("\n🔍 Testing Status Detection...", ["test_guidance_status_detection"]),
+]
+
+def run_phase(tester, test_names, concurrent=True):
+    """Run one SCHEDULE phase, its tests concurrently unless told otherwise"""
+    if not concurrent:
+        for name in test_names:
+            getattr(tester, name)()
+        return
+    if len(test_names) == 1:
+        getattr(tester, test_names[0])()
+        return
+    with ThreadPoolExecutor(max_workers=len(test_names)) as executor:
+        futures = [executor.submit(getattr(tester, name)) for name in test_names]
+        for future in futures:
+            future.result()
+
 def main():
     print("🎯 CardioCoach Adaptive Guidance Testing")
     print("=" * 50)
     
     tester = GuidanceAPITester()
+    backend = recorded_http("guidance.yaml")
+    # vcrpy is not thread-safe, so phases run serially while a cassette
+    # records (replayed calls are instant anyway)
+    recording = not isinstance(backend, nullcontext)
     
-    # Test guidance generation in English
-    print("\n⚠️  Testing Guidance Generation (EN) (may take 30-60 seconds)...")
-    tester.test_generate_guidance_english()
-    
-    # Test guidance generation in French
-    print("\n⚠️  Testing Guidance Generation (FR) (may take 30-60 seconds)...")
-    tester.test_generate_guidance_french()
-    
-    # Test getting latest guidance
-    print("\n📋 Testing Latest Guidance Retrieval...")
-    tester.test_get_latest_guidance()
-    
-    # Test status detection
-    print("\n🔍 Testing Status Detection...")
-    tester.test_guidance_status_detection()
+    with tester, backend as cassette:
+        for header, test_names in SCHEDULE:
+            print(header)
+            run_phase(tester, test_names, concurrent=not recording)
+            flush_log()
     
     # Print summary
     print("\n" + "=" * 50)
@@ -243,6 +230,8 @@ def main():
     
     success_rate = (tester.tests_passed / tester.tests_run) * 100 if tester.tests_run > 0 else 0
     print(f"\n🎯 Success Rate: {success_rate:.1f}%")
+    tester.print_timings()
+    tester.print_replays(cassette)
     
     return 0 if tester.tests_passed == tester.tests_run else 1
 
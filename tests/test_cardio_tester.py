@@ -0,0 +1,80 @@
+"""
+Regression tests for the on-disk fixture store in cardio_tester
+- Responses served by the --offline mock never reach backend_test_fixtures/,
+  including POSTs with TEST_CACHE on
+- Without the mock flag a GET is still stored (guards the check above)
+- A failed GET never overwrites the stored fixture
+"""
+import pytest
+
+import backend_test_hidden_insight as hidden
+import cardio_tester
+from cardio_tester import CardioCoachAPITester
+
+# Optional, like the --offline mode these tests exercise
+responses = pytest.importorskip("responses")
+
+BASE_URL = "http://backend.invalid/api"
+
+
+@pytest.fixture
+def fixtures_dir(tmp_path, monkeypatch):
+    """Point the fixture store at an empty temp directory"""
+    monkeypatch.setattr(cardio_tester, "FIXTURES_DIR", tmp_path)
+    return tmp_path
+
+
+@pytest.fixture
+def tester():
+    with CardioCoachAPITester(BASE_URL) as tester:
+        yield tester
+
+
+def test_offline_get_is_not_stored(fixtures_dir, tester):
+    """Test that the canned workouts list is not written as a fixture"""
+    with hidden.offline_backend(tester):
+        success, workouts = tester.run_test("Get workouts", "GET", "workouts", 200, full_body=True)
+
+    assert success
+    assert workouts[0]["id"] == "offline-1"
+    assert not list(fixtures_dir.iterdir()), "Mocked response was stored as a fixture"
+
+
+def test_offline_post_is_not_stored_with_test_cache(fixtures_dir, tester):
+    """Test that the canned French analysis is not cached as a live POST reply"""
+    tester.cache_posts = True
+    with hidden.offline_backend(tester):
+        success, response = tester.run_test(
+            "French deep analysis",
+            "POST",
+            "coach/analyze",
+            200,
+            data={"message": "Analyse approfondie", "language": "fr", "deep_analysis": True},
+            full_body=True
+        )
+
+    assert success
+    assert response["response"] == hidden.OFFLINE_ANALYSIS_FR
+    assert not list(fixtures_dir.iterdir()), "Mocked POST reply was stored as a fixture"
+
+
+def test_get_is_stored_outside_offline_mode(fixtures_dir, tester):
+    """Test that a real (here: directly mocked) GET response is still stored"""
+    with responses.RequestsMock() as mock:
+        mock.add(responses.GET, f"{BASE_URL}/workouts", json=[{"id": "w1"}], status=200)
+        success, _ = tester.run_test("Get workouts", "GET", "workouts", 200, full_body=True)
+
+    assert success
+    assert len(list(fixtures_dir.glob("*.json"))) == 1
+
+
+def test_failed_get_does_not_overwrite_fixture(fixtures_dir, tester):
+    """Test that a 500 after a good response leaves the 200 fixture in place"""
+    with responses.RequestsMock() as mock:
+        mock.add(responses.GET, f"{BASE_URL}/workouts", json=[{"id": "w1"}], status=200)
+        mock.add(responses.GET, f"{BASE_URL}/workouts", json={"detail": "boom"}, status=500)
+        assert tester.run_test("Get workouts", "GET", "workouts", 200, full_body=True)[0]
+        assert not tester.run_test("Get workouts", "GET", "workouts", 200, full_body=True)[0]
+
+    (fixture_path,) = fixtures_dir.glob("*.json")
+    assert cardio_tester._load_fixture(fixture_path)["status"] == 200
@@ -0,0 +1,113 @@
+"""
+Unit tests for the read-timeout ladder in cardio_tester
+- LadderRetry hands read timeouts back instead of resending the request
+- Other transient errors are still retried by urllib3
+- _fetch retries a read timeout once, with the profile's longer timeout,
+  also end to end against a server that never answers
+"""
+import socket
+import threading
+
+import pytest
+import requests
+from urllib3.exceptions import ProtocolError, ReadTimeoutError
+
+import cardio_tester
+from cardio_tester import CONNECT_TIMEOUT, RETRY_POLICY, TIMEOUTS, CardioCoachAPITester
+
+BASE_URL = "http://backend.invalid/api"
+
+
+class FakeResponse:
+    status_code = 200
+    content = b'{"status": "maintain"}'
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def tester():
+    with CardioCoachAPITester(BASE_URL) as tester:
+        tester.use_fixtures = False
+        yield tester
+
+
+def test_read_timeout_is_raised_back():
+    """Test that a read timeout is not retried by urllib3"""
+    error = ReadTimeoutError(None, "/api/coach/guidance", "Read timed out.")
+    with pytest.raises(ReadTimeoutError):
+        RETRY_POLICY.increment(method="POST", url="/api/coach/guidance", error=error)
+
+
+def test_protocol_error_is_still_retried():
+    """Test that a dropped connection still consumes a urllib3 retry"""
+    error = ProtocolError("Connection aborted.")
+    retry = RETRY_POLICY.increment(method="GET", url="/api/workouts", error=error)
+    assert retry.total == RETRY_POLICY.total - 1
+
+
+def test_fetch_climbs_the_timeout_ladder(tester, monkeypatch):
+    """Test that one read timeout is retried once with the longer budget"""
+    timeouts = []
+
+    def request(method, url, timeout, **kwargs):
+        timeouts.append(timeout)
+        if len(timeouts) == 1:
+            raise requests.exceptions.ReadTimeout("Read timed out.")
+        return FakeResponse()
+
+    monkeypatch.setattr(tester.session, "request", request)
+    status, raw = tester._fetch("Guidance", "POST", BASE_URL + "/coach/guidance", {"language": "en"},
+                                None, True, 'ai', expected_status=200)
+
+    assert status == 200
+    assert timeouts == [(CONNECT_TIMEOUT, TIMEOUTS['ai'][0]), (CONNECT_TIMEOUT, TIMEOUTS['ai'][1])]
+    assert TIMEOUTS['ai'][1] == 60
+
+
+def test_fetch_gives_up_after_the_last_rung(tester, monkeypatch):
+    """Test that a second read timeout fails the call without a third attempt"""
+    calls = []
+
+    def request(method, url, timeout, **kwargs):
+        calls.append(timeout)
+        raise requests.exceptions.ReadTimeout("Read timed out.")
+
+    monkeypatch.setattr(tester.session, "request", request)
+    with pytest.raises(requests.exceptions.ReadTimeout):
+        tester._fetch("Guidance", "POST", BASE_URL + "/coach/guidance", {"language": "en"},
+                      None, True, 'ai', expected_status=200)
+    assert len(calls) == len(TIMEOUTS['ai'])
+
+
+def test_silent_server_gets_one_retry(monkeypatch):
+    """Test that a hung endpoint sees exactly two requests, not 1 + total"""
+    server = socket.socket()
+    server.bind(("127.0.0.1", 0))
+    server.listen(8)
+    accepted = []
+
+    def accept():
+        while True:
+            try:
+                conn, _ = server.accept()
+            except OSError:
+                return
+            accepted.append(conn)  # never answered
+
+    threading.Thread(target=accept, daemon=True).start()
+    monkeypatch.setitem(cardio_tester.TIMEOUTS, 'ai', (0.1, 0.2))
+    base_url = f"http://127.0.0.1:{server.getsockname()[1]}/api"
+    try:
+        with CardioCoachAPITester(base_url) as tester:
+            tester.use_fixtures = False
+            success, _ = tester.run_test("Guidance", "POST", "coach/guidance", 200,
+                                         data={"language": "en"}, profile='ai')
+    finally:
+        server.close()
+        for conn in accepted:
+            conn.close()
+
+    assert not success
+    assert len(accepted) == 2